@@ -0,0 +1,10 @@
+# Animal Names Mapping
+ANIMAL_MAP = {
+    0: "Delfin", 1: "Carnero", 2: "Toro", 3: "Ciempies", 4: "Alacran", 5: "Leon", 
+    6: "Rana", 7: "Perico", 8: "Raton", 9: "Aguila", 10: "Tigre", 11: "Gato", 
+    12: "Caballo", 13: "Mono", 14: "Paloma", 15: "Zorro", 16: "Oso", 17: "Pavo", 
+    18: "Burro", 19: "Chivo", 20: "Cochino", 21: "Gallo", 22: "Camello", 23: "Cebra", 
+    24: "Iguana", 25: "Gallina", 26: "Vaca", 27: "Perro", 28: "Zamuro", 29: "Elefante", 
+    30: "Caiman", 31: "Lapa", 32: "Ardilla", 33: "Pescado", 34: "Venado", 35: "Jirafa", 
+    36: "Culebra", 37: "Ballena" # 00 mapping
+}
@@ -1,17 +1,27 @@
 import pandas as pd
 import numpy as np
 import logging
-from collections import defaultdict, Counter
-from itertools import combinations
 import datetime
+import os
+import sys
+import time
+import fast_kernels
 
 # Configuration
 INPUT_FILE = "lotto_activo_clean.csv"
 LOG_FILE = "comprehensive_miner.log"
+GAP_FILE = "lotto_activo_clean.npz" # Binary history from data_processor, holds the gap index
+SKIP_GAP_WINDOWS = True # Ignore windows that span missing dates or flagged days
 PAYOUT = 30
 MIN_OCCURRENCES = 100 # Minimum times the pattern must have triggered historically
 MIN_ROI = 15.0 # Minimum total ROI %
 MIN_STABILITY = 0.60 # Must be profitable in 60% of years active
+OUTPUT_FILE = "master_patterns.csv"
+YEARLY_FILE = "master_patterns_yearly.npz" # Per-year triggers/wins for every rule in OUTPUT_FILE (same row order)
+DECAY_HALF_LIFE = 2.0 # Years. A draw from 2 years ago weighs half as much as one from this year
+RECENT_YEARS = 3 # Window for the rolling last-N-years ROI
+MIN_SUPPORT = 30 # Minimum (weighted) triggers behind a score for a rule to be ranked on it
+RANK_SUPPORT = {"ROI": "Triggers", "ROI_Decay": "Triggers_Decay", "ROI_Recent": "Triggers_Recent"} # Ranking column -> its support
 
 logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[
     logging.FileHandler(LOG_FILE),
@@ -24,202 +34,123 @@ def load_data():
     df = df.sort_values('DateTime').reset_index(drop=True)
     return df
 
-def scan_combinations(df):
+def load_segments(n, path=GAP_FILE):
+    # Segment id per row; a window is gap-free when its first and last rows share a segment
+    if not os.path.exists(path):
+        return None
+    history = np.load(path)
+    if "gaps" not in history or len(history["numbers"]) != n:
+        logging.warning(f"{path} does not match {INPUT_FILE}, windows spanning gaps will not be skipped.")
+        return None
+    starts = np.zeros(n, dtype=np.int64)
+    starts[history["gaps"]] = 1
+    return np.cumsum(starts)
+
+def scan_combinations(df, use_jit=None):
     windows = [3, 5, 8]
-    numbers = df['Number_Int'].values
-    dates = df['DateTime'].values
+    numbers = df['Number_Int'].values.astype(np.int64)
+    years = df['DateTime'].dt.year.values
+    year_idx = years - years.min()
+    n_years = int(year_idx.max()) + 1
     n = len(numbers)
+    segments = load_segments(n) if SKIP_GAP_WINDOWS else None
     
-    # Store Stats
-    # Key: (WindowSize, PatternTuple, Target)
-    # Value: {TotalTriggers, TotalWins, ProfitableYearsCount, ActiveYearsCount}
-    # We need to track year-by-year profit efficiently.
-    # Structure: rule_stats[key] = {year: profit}
-    
-    rule_yearly_profit = defaultdict(lambda: defaultdict(int))
-    rule_triggers = defaultdict(int)
+    # Counts live in dense arrays indexed by pattern id (see fast_kernels):
+    # triggers[pid, year] and wins[pid, target, year].
+    # The inner loops run JIT-compiled when numba is installed, vectorized NumPy otherwise.
     
     logging.info(f"Scanning {n} draws across windows {windows} for Pairs & Triplets...")
     
-    # Optimization: Iterate data once? No, iterate for each window size is clearer.
-    for W in windows:
-        logging.info(f"Scanning Window Size: {W}...")
-        
-        for i in range(W, n):
-            current_year = pd.to_datetime(dates[i]).year
-            target = numbers[i]
-            
-            # Context Window
-            # Use set to avoid duplicates in window (presence is binary)
-            window_nums = sorted(list(set(numbers[i-W : i])))
-            
-            # Combinations: Pairs (2) and Triplets (3)
-            # If window has < 2 items, skip pairs. < 3 skip triplets.
-            
-            combos = []
-            if len(window_nums) >= 2:
-                combos.extend(combinations(window_nums, 2))
-            if len(window_nums) >= 3:
-                combos.extend(combinations(window_nums, 3))
-                
-            for pattern in combos:
-                key = (W, pattern, target)
-                rule_triggers[(W, pattern)] += 1 # Trigger count for the PATTERN (denominator)
-                
-                # Check win/loss later? 
-                # No, we need to associate specific target.
-                # Problem: Association Rules usually target ANY outcome.
-                # If we track (Pattern, Target), we are splitting the support.
-                # Wait. "If {A,B} -> C". We need P(C|{A,B}).
-                # So we count Triggers of {A,B}. And Wins of ({A,B}->C).
-                
-                pass
-
-    # RE-THINKING FOR EFFICIENCY:
-    # 30,000 draws.
-    # ~1000 combos per draw? No, window 5 has 5C2=10 pairs, 5C3=10 triplets. Total 20.
-    # Window 8 has 8C2=28, 8C3=56. Total ~84.
-    # Total ops = 30,000 * 84 = 2.5 million. Very Fast.
-    # The bottleneck is updating dictionaries.
-    
-    # New Structure:
-    # pattern_triggers[(W, pattern)] -> count
-    # pattern_outcomes[(W, pattern)] -> Counter(target)
-    # pattern_yearly_outcomes[(W, pattern, target)] -> {year: profit}
-    
-    pattern_triggers = defaultdict(int)
-    pattern_yearly_profit = defaultdict(lambda: defaultdict(int))
-    
-    for W in windows:
-        logging.info(f"  Window {W}...")
-        for i in range(W, n):
-            current_year = pd.to_datetime(dates[i]).year
-            target = numbers[i]
-            window_nums = sorted(list(set(numbers[i-W : i])))
-            
-            combos = []
-            if len(window_nums) >= 2:
-                combos.extend(combinations(window_nums, 2))
-            if len(window_nums) >= 3:
-                combos.extend(combinations(window_nums, 3))
-            
-            for pat in combos:
-                pattern_triggers[(W, pat)] += 1
-                
-                # Calculate Profit for THIS specific target outcome
-                # But wait, we don't know if we 'bet' on this target yet.
-                # In mining, we just record "This target happened".
-                # Profit calcs happen post-mining.
-                # We update profit for the specific rule (Pat -> Target).
-                # Profit = PAYOUT - 1 (Win)
-                # But for every OTHER target that didn't happen, we lost 1 unit?
-                # No. A rule is specific: "If A,B -> Bet C".
-                # So if A,B happened, did C happen?
-                # If yes -> +29. If no -> -1.
-                
-                # So we need to update "Loss" for ALL potential targets? No that's infinite.
-                # We update "Trigger" count for the pattern.
-                # And "Win" count for (Pattern, Target).
-                # Only "Win" adds +30 revenue.
-                # Cost is determined by Triggers.
-                
-                # So: 
-                # pattern_triggers[(W, pat)] -> Triggers (Total Cost)
-                # pattern_wins[(W, pat, target)] -> {year: wins}
-                # pattern_triggers_yearly[(W, pat)] -> {year: count}
-                
-                # This way we can reconstruct Yearly ROI for any (Pat->Target).
-                
-                # However, updating dicts inside inner loop is slow?
-                # Let's try.
-                
-                # Optimization for Profit:
-                # We only care about (Pat->Target) if it actually WINS often.
-                # So let's just count wins.
-                
-                pass
-
-    # Implementation of Loop
-    pattern_triggers_yearly = defaultdict(lambda: defaultdict(int))
-    pattern_wins_yearly = defaultdict(lambda: defaultdict(int))
-    
-    for W in windows:
-        for i in range(W, n):
-            year = pd.to_datetime(dates[i]).year
-            target = numbers[i]
-            window_nums = sorted(list(set(numbers[i-W : i])))
-            
-            combos = []
-            if len(window_nums) >= 2: combos.extend(combinations(window_nums, 2))
-            if len(window_nums) >= 3: combos.extend(combinations(window_nums, 3))
-            
-            for pat in combos:
-                pattern_triggers_yearly[(W, pat)][year] += 1
-                pattern_wins_yearly[(W, pat, target)][year] += 1
-                
-    # Analysis & Formatting
-    logging.info("Mining Complete. Analyzing profit stability...")
-    
     results = []
+    rank_keys = []
+    rule_windows, rule_patterns, rule_targets = [], [], []
+    rule_triggers_yearly, rule_wins_yearly = [], []
     
-    # Iterate over all specific rules that had at least one win
-    # We iterate pattern_wins_yearly keys: (W, pat, target)
-    
-    for rule_key, wins_by_year in pattern_wins_yearly.items():
-        W, pat, target = rule_key
+    for w_order, W in enumerate(windows):
+        logging.info(f"  Window {W}...")
+        sets = fast_kernels.window_sets(numbers, W, use_jit=use_jit)
+        draw_targets, draw_years = numbers[W:], year_idx[W:]
+        if segments is not None:
+            gap_free = segments[W:] == segments[:-W]
+            logging.info(f"    Skipping {(~gap_free).sum()} windows that span gaps.")
+            sets, draw_targets, draw_years = sets[gap_free], draw_targets[gap_free], draw_years[gap_free]
+        triggers, wins, first_seen = fast_kernels.count_combinations(
+            sets, draw_targets, draw_years, n_years, use_jit=use_jit)
         
-        # Get total triggers by year from the parent pattern
-        triggers_by_year = pattern_triggers_yearly[(W, pat)]
+        # Analysis, vectorized across every (pattern -> target) rule with at least one win
+        total_triggers = triggers.sum(axis=1)
+        total_wins = wins.sum(axis=2)
         
-        total_triggers = sum(triggers_by_year.values())
-        if total_triggers < MIN_OCCURRENCES:
-            continue
-            
-        total_wins = sum(wins_by_year.values())
+        candidate = (total_wins > 0) & (total_triggers[:, None] >= MIN_OCCURRENCES)
+        pids, targets = np.nonzero(candidate)
+        t_trig = total_triggers[pids]
+        t_wins = total_wins[pids, targets]
         
         # Calculate Global ROI
-        global_balance = (total_wins * PAYOUT) - total_triggers
-        global_roi = (global_balance / total_triggers) * 100
+        global_balance = (t_wins * PAYOUT) - t_trig
+        global_roi = (global_balance / t_trig) * 100
         
-        if global_roi < MIN_ROI:
-            continue
-            
-        # Check Stability
-        years_active = 0
-        years_profitable = 0
+        keep = global_roi >= MIN_ROI
+        pids, targets = pids[keep], targets[keep]
+        t_trig, t_wins = t_trig[keep], t_wins[keep]
+        global_balance, global_roi = global_balance[keep], global_roi[keep]
         
-        # Check years 2017-2025
-        all_years = sorted(list(triggers_by_year.keys()))
+        # Check Stability (year by year)
+        yearly_triggers = triggers[pids]
+        yearly_balance = (wins[pids, targets] * PAYOUT) - yearly_triggers
+        years_active = (yearly_triggers > 0).sum(axis=1)
+        years_profitable = ((yearly_triggers > 0) & (yearly_balance > 0)).sum(axis=1)
+        stability = np.where(years_active > 0, years_profitable / np.maximum(years_active, 1), 0)
         
-        for y in all_years:
-            t = triggers_by_year[y]
-            w = wins_by_year.get(y, 0)
-            bal = (w * PAYOUT) - t
-            
-            if t > 0:
-                years_active += 1
-                if bal > 0:
-                    years_profitable += 1
-        
-        stability = years_profitable / years_active if years_active > 0 else 0
+        stable = stability >= MIN_STABILITY
+        rule_windows.append(np.full(stable.sum(), W))
+        rule_patterns.append(fast_kernels.PATTERN_VALUES[pids[stable]])
+        rule_targets.append(targets[stable])
+        rule_triggers_yearly.append(yearly_triggers[stable])
+        rule_wins_yearly.append(wins[pids, targets][stable])
         
-        if stability >= MIN_STABILITY:
+        for k in np.nonzero(stable)[0]:
             results.append({
                 "Window": W,
-                "Pattern": list(pat),
-                "Target": target,
-                "Triggers": total_triggers,
-                "Wins": total_wins,
-                "Balance": global_balance,
-                "ROI": global_roi,
-                "Stability": f"{years_profitable}/{years_active} ({stability:.0%})"
+                "Pattern": list(fast_kernels.pattern_tuple(pids[k])),
+                "Target": int(targets[k]),
+                "Triggers": int(t_trig[k]),
+                "Wins": int(t_wins[k]),
+                "Balance": int(global_balance[k]),
+                "ROI": float(global_roi[k]),
+                "Stability": f"{years_profitable[k]}/{years_active[k]} ({stability[k]:.0%})"
             })
+            # Ties in ROI keep the order in which rules were first observed
+            rank_keys.append((w_order, first_seen[pids[k] * fast_kernels.N_ANIMALS + targets[k]]))
             
-    # Sort by ROI
-    results.sort(key=lambda x: x['ROI'], reverse=True)
+    logging.info("Mining Complete. Analyzing profit stability...")
+    
+    # Sort by ROI (ties keep first-observed order)
+    order = sorted(range(len(results)), key=lambda k: (-results[k]['ROI'], rank_keys[k]))
+    results = [results[k] for k in order]
+    yearly = {
+        "years": np.arange(years.min(), years.min() + n_years),
+        "first_date": np.datetime64(df['DateTime'].min().date(), 'D'),
+        "last_date": np.datetime64(df['DateTime'].max().date(), 'D'),
+        "window": np.concatenate(rule_windows)[order],
+        "pattern": np.concatenate(rule_patterns)[order],
+        "target": np.concatenate(rule_targets)[order],
+        "triggers": np.concatenate(rule_triggers_yearly)[order],
+        "wins": np.concatenate(rule_wins_yearly)[order],
+    }
     
-    # Save to CSV
-    pd.DataFrame(results).to_csv("master_patterns.csv", index=False)
+    # Recency-weighted and rolling metrics, straight from the per-year arrays
+    scores = score_rules(yearly["triggers"], yearly["wins"], yearly["years"],
+                         first_date=yearly["first_date"], last_date=yearly["last_date"])
+    for k, r in enumerate(results):
+        r["ROI_Decay"] = float(scores["ROI_Decay"][k])
+        r["Triggers_Decay"] = float(scores["Triggers_Decay"][k])
+        r["ROI_Recent"] = float(scores["ROI_Recent"][k])
+        r["Triggers_Recent"] = int(scores["Triggers_Recent"][k])
+    
+    # Save to CSV (+ per-year arrays so rules can be re-ranked without a re-mine)
+    pd.DataFrame(results).to_csv(OUTPUT_FILE, index=False)
+    np.savez_compressed(YEARLY_FILE, **yearly)
     
     # Log Top 20
     logging.info(f"\n--- TOP 20 STABLE PATTERNS ---")
@@ -232,6 +163,94 @@ def scan_combinations(df):
 
     return results
 
+def year_ages(years, first_date=None, last_date=None):
+    # Age in years, counted back from the last draw, of the midpoint and the end of each
+    # calendar year's covered span. A partial last year is recent, not a full year of weight.
+    years = np.asarray(years)
+    if first_date is None:
+        first_date = np.datetime64(f"{years.min()}-01-01")
+    if last_date is None:
+        last_date = np.datetime64(f"{years.max()}-12-31")
+    starts = np.maximum(np.array([f"{y}-01-01" for y in years], dtype='datetime64[D]'), first_date)
+    ends = np.minimum(np.array([f"{y}-12-31" for y in years], dtype='datetime64[D]'), last_date)
+    start_days = (last_date - starts).astype(np.float64)
+    end_days = (last_date - ends).astype(np.float64)
+    return (start_days + end_days) / 2 / 365.25, end_days / 365.25
+
+def score_rules(triggers, wins, years, half_life=DECAY_HALF_LIFE, recent_years=RECENT_YEARS,
+                first_date=None, last_date=None):
+    """Per-rule ROI metrics from (rules x years) trigger/win arrays, vectorized across all rules.
+    
+    ROI_Yearly: ROI % of each year (NaN where the rule never triggered).
+    ROI_Decay: ROI % with each year weighted by 0.5 ** (age / half_life), age taken at the
+    midpoint of the year's data. Triggers_Decay is the weighted trigger count behind it.
+    ROI_Recent: ROI % over the years that end within `recent_years` of the last draw.
+    Triggers_Recent is the trigger count behind it.
+    """
+    triggers = np.asarray(triggers, dtype=np.float64)
+    balance = np.asarray(wins, dtype=np.float64) * PAYOUT - triggers
+    mid_age, end_age = year_ages(years, first_date, last_date)
+    
+    weights = 0.5 ** (mid_age / half_life)
+    recent = (end_age < recent_years).astype(np.float64)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            "ROI_Yearly": balance / triggers * 100,
+            "ROI_Decay": (balance @ weights) / (triggers @ weights) * 100,
+            "Triggers_Decay": triggers @ weights,
+            "ROI_Recent": (balance @ recent) / (triggers @ recent) * 100,
+            "Triggers_Recent": triggers @ recent,
+        }
+
+def rank_rules(by="ROI_Decay", half_life=DECAY_HALF_LIFE, recent_years=RECENT_YEARS, min_support=MIN_SUPPORT):
+    """Re-rank the mined rule set under a different policy, using YEARLY_FILE only.
+    
+    Rules with fewer than `min_support` (weighted) triggers behind the `by` score are dropped.
+    The per-year ROI vector (ROI_Yearly) comes last, one ROI_<year> column per mined year.
+    """
+    if by not in RANK_SUPPORT:
+        raise ValueError(f"Unknown ranking column '{by}', use one of: {', '.join(RANK_SUPPORT)}")
+    yearly = np.load(YEARLY_FILE)
+    triggers, wins = yearly["triggers"], yearly["wins"]
+    scores = score_rules(triggers, wins, yearly["years"], half_life, recent_years,
+                         first_date=yearly["first_date"] if "first_date" in yearly else None,
+                         last_date=yearly["last_date"] if "last_date" in yearly else None)
+    
+    total_triggers = triggers.sum(axis=1)
+    total_wins = wins.sum(axis=1)
+    years_active = (triggers > 0).sum(axis=1)
+    years_profitable = ((triggers > 0) & ((wins * PAYOUT) - triggers > 0)).sum(axis=1)
+    ranked = pd.DataFrame({
+        "Window": yearly["window"],
+        "Pattern": [[int(v) for v in p if v >= 0] for p in yearly["pattern"]],
+        "Target": yearly["target"],
+        "Triggers": total_triggers,
+        "Wins": total_wins,
+        "ROI": ((total_wins * PAYOUT) - total_triggers) / total_triggers * 100,
+        "Stability": [f"{p}/{a} ({p / a:.0%})" for p, a in zip(years_profitable, years_active)],
+        "ROI_Decay": scores["ROI_Decay"],
+        "Triggers_Decay": scores["Triggers_Decay"],
+        "ROI_Recent": scores["ROI_Recent"],
+        "Triggers_Recent": scores["Triggers_Recent"].astype(int),
+        **{f"ROI_{y}": scores["ROI_Yearly"][:, i] for i, y in enumerate(yearly["years"])},
+    })
+    ranked = ranked[ranked[RANK_SUPPORT[by]] >= min_support]
+    return ranked.sort_values(by, ascending=False, kind="stable").reset_index(drop=True)
+
 if __name__ == "__main__":
-    df = load_data()
-    scan_combinations(df)
+    if len(sys.argv) > 1 and sys.argv[1] == "rerank":
+        # python comprehensive_miner.py rerank [ROI_Decay|ROI_Recent|ROI] [MIN_SUPPORT]
+        by = sys.argv[2] if len(sys.argv) > 2 else "ROI_Decay"
+        t0 = time.perf_counter()
+        try:
+            min_support = float(sys.argv[3]) if len(sys.argv) > 3 else MIN_SUPPORT
+            ranked = rank_rules(by, min_support=min_support)
+        except ValueError as e:
+            logging.error(str(e))
+            sys.exit(1)
+        logging.info(f"Re-ranked {len(ranked)} rules by {by} (support >= {min_support}) in {time.perf_counter() - t0:.3f}s")
+        logging.info(ranked.head(20).loc[:, :"Triggers_Recent"].to_string())
+    else:
+        df = load_data()
+        scan_combinations(df)
@@ -1,10 +1,22 @@
 import pandas as pd
 import numpy as np
 import logging
+import os
+from animals import ANIMAL_MAP
 
 # Configuration
 INPUT_FILE = "lotto_activo_raw.csv" # Will switch to complete file later
 OUTPUT_FILE = "lotto_activo_clean.csv"
+BINARY_FILE = "lotto_activo_clean.npz" # Compact copy for the bot (numbers + dates + gap index, no pandas needed to read)
+RESCRAPE_FILE = "rescrape_dates.txt" # Dates flagged by validate_data, input for `python scraper.py rescrape_dates.txt`
+RESCRAPE_OUTPUT = "lotto_activo_rescrape.csv" # Scraper output for those dates; replaces their rows in INPUT_FILE
+
+# Validation
+HOLIDAYS = ("01-01", "12-25") # MM-DD with no draws at all
+SHORT_DAYS = ("12-24", "12-31") # MM-DD with a reduced schedule (not flagged when short)
+ERA_WINDOW = 31 # Days for the rolling median that defines the expected draws/day of a schedule era
+SCRAPE_START = "2017-01-01" # First date the scraper fetches (scraper.START_DATE); earlier empty days are flagged
+SCRAPE_END = None # Last date it fetches; None: today (scraper.END_DATE), so a run blocked near the end is caught
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -17,7 +29,16 @@ def load_data(filepath):
         logging.error(f"Error loading {filepath}: {e}")
         return None
 
-def clean_data(df):
+def merge_rescrape(df, path=RESCRAPE_OUTPUT):
+    # Re-scraped dates replace whatever the bulk scrape had for them
+    if not os.path.exists(path):
+        return df
+    fresh = pd.read_csv(path)
+    stale = df['Date'].isin(fresh['Date'].unique())
+    logging.info(f"Merged {len(fresh)} re-scraped rows for {fresh['Date'].nunique()} dates (replacing {stale.sum()} rows).")
+    return pd.concat([df[~stale], fresh], ignore_index=True)
+
+def clean_data(df, drop_invalid=True):
     # 1. Handle "00" vs "0" (The Whale Trap)
     # The scraper returns "00" as a string. We need to map it.
     # We will convert Animal_Number to integer.
@@ -41,9 +62,9 @@ def clean_data(df):
     # This fixes the data integrity issue where 0 (Delfin) and 00 (Ballena) were mixed.
     df.loc[df['Animal_Name'].str.strip().str.lower() == 'ballena', 'Number_Int'] = 37
     
-    # Drop errors
+    # Drop errors (validate_data needs to see them first, so main() drops them later)
     errors = df[df['Number_Int'] == -999]
-    if not errors.empty:
+    if drop_invalid and not errors.empty:
         logging.warning(f"Dropped {len(errors)} rows with invalid numbers.")
         df = df[df['Number_Int'] != -999]
 
@@ -76,10 +97,128 @@ def normalize_schedules(df):
 
     return df
 
+def validate_data(df, start=SCRAPE_START, end=SCRAPE_END):
+    """Integrity checks over the cleaned, not yet deduplicated draws (one vectorized pass).
+
+    Missing dates are looked for over the whole scrape range [start, end], not just between
+    the first and last draw on file. Returns a dict of DataFrames (eras, short_days,
+    missing_ranges, conflicts, mismatches, invalid) plus `bad_dates` (days whose windows
+    can't be trusted) and `rescrape_dates`, both without duplicates.
+    """
+    dates = pd.to_datetime(df['Date']).dt.normalize()
+    valid = df['Number_Int'] != -999
+    
+    # 1. Duplicate slots: same (Date, Time) scraped twice. A conflict is when the animals differ.
+    slot_animals = df[valid].groupby([dates[valid], df.loc[valid, 'Time']])['Number_Int'].transform('nunique')
+    conflicts = df[valid][slot_animals > 1].sort_values(['Date', 'Time'])
+    
+    # 2. Number/name mismatches (names compared without case, spaces or accents)
+    expected_name = df['Number_Int'].map(ANIMAL_MAP)
+    def fold(names):
+        return names.astype(str).str.strip().str.lower().str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    mismatches = df[valid & (fold(df['Animal_Name']) != fold(expected_name))]
+    invalid = df[~valid]
+    
+    # 3. Expected draws per day per schedule era (rolling median of distinct slots per day)
+    slots = df[valid].drop_duplicates(subset=['Date', 'Time'])
+    per_day = slots.groupby(dates[valid].loc[slots.index]).size()
+    expected = per_day.rolling(ERA_WINDOW, center=True, min_periods=1).median().round().astype(int)
+    era_id = (expected != expected.shift()).cumsum()
+    eras = pd.DataFrame({'Date': per_day.index, 'Expected': expected.values, 'Era': era_id.values}).groupby('Era').agg(
+        Start=('Date', 'min'), End=('Date', 'max'), Draws_Per_Day=('Expected', 'first'), Days=('Date', 'size'))
+    
+    month_day = per_day.index.strftime('%m-%d')
+    short = (per_day < expected) & ~month_day.isin(SHORT_DAYS)
+    over = per_day > expected
+    short_days = pd.DataFrame({'Draws': per_day, 'Expected': expected})[short | over]
+    
+    # 4. Missing dates (no draws at all, holidays excluded), collapsed into ranges
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp.today().normalize() if end is None else pd.Timestamp(end).normalize()
+    calendar = pd.date_range(start, end)
+    missing = calendar.difference(per_day.index)
+    missing = missing[~missing.strftime('%m-%d').isin(HOLIDAYS)]
+    run_id = np.cumsum(np.diff(missing.values, prepend=missing.values[:1]) != np.timedelta64(1, 'D'))
+    missing_ranges = pd.DataFrame({'Date': missing, 'Run': run_id}).groupby('Run').agg(
+        Start=('Date', 'min'), End=('Date', 'max'), Days=('Date', 'size')).reset_index(drop=True)
+    
+    bad_dates = pd.DatetimeIndex(short_days.index).union(pd.to_datetime(conflicts['Date']).dt.normalize()) \
+        .union(pd.to_datetime(invalid['Date']).dt.normalize()).union(pd.to_datetime(mismatches['Date']).dt.normalize()).unique()
+    rescrape_dates = bad_dates.union(missing).unique()
+    
+    return {
+        'eras': eras.reset_index(drop=True),
+        'short_days': short_days,
+        'missing_ranges': missing_ranges,
+        'missing_dates': missing,
+        'conflicts': conflicts,
+        'mismatches': mismatches,
+        'invalid': invalid,
+        'bad_dates': bad_dates,
+        'rescrape_dates': rescrape_dates,
+    }
+
+def log_validation(report):
+    logging.info(f"Schedule eras: " + ", ".join(
+        f"{r.Start:%Y-%m-%d}..{r.End:%Y-%m-%d} ({r.Draws_Per_Day}/day)" for r in report['eras'].itertuples()))
+    logging.info(f"Days with unexpected draw count: {len(report['short_days'])}")
+    logging.info(f"Missing dates: {len(report['missing_dates'])} in {len(report['missing_ranges'])} ranges")
+    for r in report['missing_ranges'][report['missing_ranges']['Days'] > 1].itertuples():
+        logging.info(f"  {r.Start:%Y-%m-%d} -> {r.End:%Y-%m-%d} ({r.Days} days)")
+    logging.info(f"Conflicting duplicate slots: {len(report['conflicts'])} rows | Number/name mismatches: {len(report['mismatches'])} | Invalid numbers: {len(report['invalid'])}")
+    logging.info(f"Dates to re-scrape: {len(report['rescrape_dates'])}")
+
+def save_rescrape_dates(report, path=RESCRAPE_FILE):
+    with open(path, 'w') as f:
+        f.writelines(f"{d:%Y-%m-%d}\n" for d in report['rescrape_dates'])
+    logging.info(f"Saved re-scrape list to {path}")
+
+def build_gap_index(df, report):
+    """Row positions (in DateTime order) where draw continuity breaks.
+    
+    A window over rows [i-W, i] is gap-free iff no position in (i-W, i] is listed.
+    Breaks: the first row after missing dates, every row of a bad date and the first row after one.
+    """
+    dates = pd.to_datetime(df.sort_values('DateTime')['Date']).dt.normalize().values
+    if len(dates) == 0:
+        return np.empty(0, dtype=np.int32)
+    bad = np.isin(dates, report['bad_dates'].values)
+    
+    # Missing (non-holiday) dates strictly between two consecutive rows
+    missing = np.sort(report['missing_dates'].values)
+    missing_before = np.searchsorted(missing, dates)
+    after_missing = np.zeros(len(dates), dtype=bool)
+    after_missing[1:] = missing_before[1:] > missing_before[:-1]
+    
+    after_bad = np.zeros(len(dates), dtype=bool)
+    after_bad[1:] = bad[:-1]
+    return np.nonzero(after_missing | bad | after_bad)[0].astype(np.int32)
+
+def save_binary_history(df, gaps=None, path=BINARY_FILE):
+    # Chronological numbers (int8), draw dates (datetime64[D]) and gap index (see build_gap_index)
+    df = df.sort_values('DateTime')
+    np.savez_compressed(
+        path,
+        numbers=df['Number_Int'].values.astype(np.int8),
+        dates=pd.to_datetime(df['Date']).values.astype('datetime64[D]'),
+        gaps=np.empty(0, dtype=np.int32) if gaps is None else gaps,
+    )
+    logging.info(f"Saved binary history to {path}")
+
 def main():
     df = load_data(INPUT_FILE)
     if df is not None and not df.empty:
-        df = clean_data(df)
+        df = merge_rescrape(df)
+        df = clean_data(df, drop_invalid=False)
+        
+        report = validate_data(df)
+        log_validation(report)
+        save_rescrape_dates(report)
+        
+        invalid = df['Number_Int'] == -999
+        if invalid.any():
+            logging.warning(f"Dropped {invalid.sum()} rows with invalid numbers.")
+            df = df[~invalid]
         df = normalize_schedules(df)
         
         logging.info(f"Final dataset: {len(df)} rows.")
@@ -87,6 +226,7 @@ def main():
         
         df.to_csv(OUTPUT_FILE, index=False)
         logging.info(f"Saved cleaned data to {OUTPUT_FILE}")
+        save_binary_history(df, build_gap_index(df, report))
 
 if __name__ == "__main__":
     main()
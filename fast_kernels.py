@@ -0,0 +1,367 @@
+import numpy as np
+import logging
+import os
+import importlib.util
+import time
+from itertools import combinations
+
+# Configuration
+N_ANIMALS = 38 # 0-36 plus 00 mapped to 37
+SECTOR_SPLIT = 18 # Low: 0-18, High: 19-37
+
+# Optional JIT. Set ANIMALITOS_JIT=0 to force the pure-NumPy path.
+# numba itself is only imported on first JIT call (it is slow to import).
+HAS_NUMBA = importlib.util.find_spec("numba") is not None
+
+USE_JIT = HAS_NUMBA and os.environ.get("ANIMALITOS_JIT", "1") != "0"
+
+def _resolve(use_jit):
+    if use_jit is None:
+        return USE_JIT
+    if use_jit and not HAS_NUMBA:
+        raise RuntimeError("numba is not installed, JIT path unavailable")
+    return use_jit
+
+# --- Pattern Index ---
+# Every pair and triplet of animals gets a dense id so counts live in flat arrays
+# instead of dicts keyed by tuples. Pairs come first, then triplets, both in
+# itertools.combinations order. Pairs are looked up as PATTERN_INDEX[a, b, N_ANIMALS].
+
+def build_pattern_index():
+    index = np.full((N_ANIMALS, N_ANIMALS, N_ANIMALS + 1), -1, dtype=np.int64)
+    values = []
+    for a, b in combinations(range(N_ANIMALS), 2):
+        index[a, b, N_ANIMALS] = len(values)
+        values.append((a, b, -1))
+    for a, b, c in combinations(range(N_ANIMALS), 3):
+        index[a, b, c] = len(values)
+        values.append((a, b, c))
+    return index, np.array(values, dtype=np.int64)
+
+PATTERN_INDEX, PATTERN_VALUES = build_pattern_index()
+N_PATTERNS = len(PATTERN_VALUES)
+
+def pattern_tuple(pid):
+    a, b, c = PATTERN_VALUES[pid]
+    return (int(a), int(b)) if c < 0 else (int(a), int(b), int(c))
+
+# --- Window Sets ---
+# Row r holds the sorted distinct animals of numbers[r : r+W] (the context of draw r+W),
+# padded on the right with N_ANIMALS.
+
+def _window_sets_numpy(numbers, W):
+    n = len(numbers)
+    if n <= W:
+        return np.empty((0, W), dtype=np.int64)
+    view = np.lib.stride_tricks.sliding_window_view(numbers, W)[:n - W]
+    sets = np.sort(view, axis=1)
+    dup = np.zeros_like(sets, dtype=bool)
+    dup[:, 1:] = sets[:, 1:] == sets[:, :-1]
+    sets[dup] = N_ANIMALS
+    return np.sort(sets, axis=1)
+
+def _window_sets_loop(numbers, W):
+    n = len(numbers)
+    m = max(n - W, 0)
+    sets = np.full((m, W), N_ANIMALS, dtype=np.int64)
+    present = np.zeros(N_ANIMALS, dtype=np.bool_)
+    for r in range(m):
+        present[:] = False
+        for j in range(r, r + W):
+            present[numbers[j]] = True
+        k = 0
+        for v in range(N_ANIMALS):
+            if present[v]:
+                sets[r, k] = v
+                k += 1
+    return sets
+
+# --- Combination Counting ---
+# triggers[pid, year]         -> times the pattern was present before a draw
+# wins[pid, target, year]     -> times the pattern was followed by target
+# first_seen[pid * N + target] -> order in which the rule was first observed (for stable ranking)
+
+def _slot_combos(W):
+    pairs = list(combinations(range(W), 2))
+    triplets = list(combinations(range(W), 3))
+    return pairs, triplets
+
+def window_pattern_ids(sets):
+    """Pattern id of every pair/triplet in each window set, shape (rows, combos), -1 where absent.
+    
+    Columns are pairs then triplets in combinations order, so a row-major ravel follows the
+    same order as looping draw by draw."""
+    m, W = sets.shape
+    pairs, triplets = _slot_combos(W)
+    pids = np.full((m, len(pairs) + len(triplets)), -1, dtype=np.int64)
+    for c, (j, k) in enumerate(pairs):
+        a, b = sets[:, j], sets[:, k]
+        valid = b < N_ANIMALS
+        pids[valid, c] = PATTERN_INDEX[a[valid], b[valid], N_ANIMALS]
+    for c, (j, k, l) in enumerate(triplets, start=len(pairs)):
+        a, b, d = sets[:, j], sets[:, k], sets[:, l]
+        valid = d < N_ANIMALS
+        pids[valid, c] = PATTERN_INDEX[a[valid], b[valid], d[valid]]
+    return pids
+
+def _count_combinations_numpy(sets, targets, year_idx, n_years):
+    m = len(sets)
+    pids = window_pattern_ids(sets)
+    n_combos = pids.shape[1]
+
+    # Row-major ravel keeps the draw-by-draw, pairs-then-triplets order of the original loop
+    flat = pids.ravel()
+    rows = np.repeat(np.arange(m), n_combos)
+    valid = flat >= 0
+    flat, rows = flat[valid], rows[valid]
+    years = year_idx[rows]
+    rule_keys = flat * N_ANIMALS + targets[rows]
+
+    triggers = np.bincount(flat * n_years + years, minlength=N_PATTERNS * n_years)
+    wins = np.bincount(rule_keys * n_years + years, minlength=N_PATTERNS * N_ANIMALS * n_years)
+
+    first_seen = np.full(N_PATTERNS * N_ANIMALS, np.iinfo(np.int64).max, dtype=np.int64)
+    uniq, first_pos = np.unique(rule_keys, return_index=True)
+    first_seen[uniq] = first_pos
+
+    return (triggers.reshape(N_PATTERNS, n_years),
+            wins.reshape(N_PATTERNS, N_ANIMALS, n_years),
+            first_seen)
+
+def _count_combinations_loop(sets, targets, year_idx, n_years, pattern_index):
+    m, W = sets.shape
+    n_patterns = pattern_index.max() + 1
+    triggers = np.zeros((n_patterns, n_years), dtype=np.int64)
+    wins = np.zeros((n_patterns, N_ANIMALS, n_years), dtype=np.int64)
+    first_seen = np.full(n_patterns * N_ANIMALS, np.iinfo(np.int64).max, dtype=np.int64)
+    seq = 0
+    for r in range(m):
+        y = year_idx[r]
+        t = targets[r]
+        size = 0
+        while size < W and sets[r, size] < N_ANIMALS:
+            size += 1
+        for j in range(size):
+            for k in range(j + 1, size):
+                pid = pattern_index[sets[r, j], sets[r, k], N_ANIMALS]
+                triggers[pid, y] += 1
+                wins[pid, t, y] += 1
+                key = pid * N_ANIMALS + t
+                if first_seen[key] > seq:
+                    first_seen[key] = seq
+                seq += 1
+        for j in range(size):
+            for k in range(j + 1, size):
+                for l in range(k + 1, size):
+                    pid = pattern_index[sets[r, j], sets[r, k], sets[r, l]]
+                    triggers[pid, y] += 1
+                    wins[pid, t, y] += 1
+                    key = pid * N_ANIMALS + t
+                    if first_seen[key] > seq:
+                        first_seen[key] = seq
+                    seq += 1
+    return triggers, wins, first_seen
+
+# --- Sector Backtest ---
+# For each draw i in [start_idx, n): bet the top `bet_size` animals of the sector opposite
+# to numbers[i-1], ranked by Markov followers of numbers[i-1] in the last `history_window`
+# draws, then by plain frequency. Ties break by first appearance, like value_counts().
+# Returns picks (padded with -1) and per-draw profit.
+
+def _sector_backtest_numpy(numbers, start_idx, history_window, bet_size, payout):
+    n = len(numbers)
+    idx = np.arange(start_idx, n)
+    m = len(idx)
+    never = n # position used for "not seen"
+
+    onehot = np.zeros((n, N_ANIMALS), dtype=np.int64)
+    onehot[np.arange(n), numbers] = 1
+    cum = np.vstack([np.zeros((1, N_ANIMALS), dtype=np.int64), np.cumsum(onehot, axis=0)])
+
+    def next_occurrence(hits):
+        # nxt[p, k] = smallest j >= p with hits[j, k], else `never`
+        pos = np.where(hits, np.arange(n)[:, None], never)
+        nxt = np.minimum.accumulate(pos[::-1], axis=0)[::-1]
+        return np.vstack([nxt, np.full((1, N_ANIMALS), never)])
+
+    gen_count = cum[idx] - cum[idx - history_window]
+    gen_first = next_occurrence(onehot.astype(bool))[idx - history_window]
+
+    # Followers of `last` inside the window: rows j in [i-W+1, i-1] with numbers[j-1] == last
+    last = numbers[idx - 1]
+    fol_count = np.zeros((m, N_ANIMALS), dtype=np.int64)
+    fol_first = np.full((m, N_ANIMALS), never, dtype=np.int64)
+    prev = np.concatenate([[-1], numbers[:-1]])
+    for v in np.unique(last):
+        rows = np.nonzero(last == v)[0]
+        hits = onehot.astype(bool) & (prev == v)[:, None]
+        cum_v = np.vstack([np.zeros((1, N_ANIMALS), dtype=np.int64), np.cumsum(hits, axis=0)])
+        lo = idx[rows] - history_window + 1
+        fol_count[rows] = cum_v[idx[rows]] - cum_v[lo]
+        fol_first[rows] = next_occurrence(hits)[lo]
+
+    animals = np.arange(N_ANIMALS)
+    target_high = (last <= SECTOR_SPLIT)[:, None]
+    in_sector = (animals[None, :] > SECTOR_SPLIT) == target_high
+
+    # Tier 0: followers, tier 1: frequency fill, tier 2: not eligible
+    tier = np.full((m, N_ANIMALS), 2, dtype=np.int64)
+    tier[in_sector & (gen_count > 0)] = 1
+    tier[in_sector & (fol_count > 0)] = 0
+    count = np.where(tier == 0, fol_count, gen_count)
+    first = np.where(tier == 0, fol_first, gen_first)
+    key = (tier * (history_window + 1) + (history_window - count)) * (never + 1) + first
+
+    order = np.argsort(key, axis=1, kind="stable")[:, :bet_size]
+    picks = np.where(np.take_along_axis(tier, order, axis=1) < 2, order, -1)
+
+    hit = (picks == numbers[idx][:, None]).any(axis=1)
+    profit = np.where(hit, payout - bet_size, -bet_size)
+    return picks, profit
+
+def _sector_backtest_loop(numbers, start_idx, history_window, bet_size, payout):
+    n = len(numbers)
+    m = max(n - start_idx, 0)
+    never = n
+    picks = np.full((m, bet_size), -1, dtype=np.int64)
+    profit = np.zeros(m, dtype=np.int64)
+    gen_count = np.zeros(N_ANIMALS, dtype=np.int64)
+    gen_first = np.zeros(N_ANIMALS, dtype=np.int64)
+    fol_count = np.zeros(N_ANIMALS, dtype=np.int64)
+    fol_first = np.zeros(N_ANIMALS, dtype=np.int64)
+    taken = np.zeros(N_ANIMALS, dtype=np.bool_)
+
+    for r in range(m):
+        i = start_idx + r
+        last = numbers[i - 1]
+        target_high = last <= SECTOR_SPLIT
+        gen_count[:] = 0
+        gen_first[:] = never
+        fol_count[:] = 0
+        fol_first[:] = never
+        taken[:] = False
+
+        lo = i - history_window
+        for j in range(lo, i):
+            v = numbers[j]
+            gen_count[v] += 1
+            if gen_first[v] == never:
+                gen_first[v] = j
+            if j > lo and numbers[j - 1] == last:
+                fol_count[v] += 1
+                if fol_first[v] == never:
+                    fol_first[v] = j
+
+        k = 0
+        for tier in range(2):
+            while k < bet_size:
+                best = -1
+                for v in range(N_ANIMALS):
+                    if taken[v] or (v > SECTOR_SPLIT) != target_high:
+                        continue
+                    if tier == 0:
+                        c, f = fol_count[v], fol_first[v]
+                    else:
+                        c, f = gen_count[v], gen_first[v]
+                    if c == 0:
+                        continue
+                    if best == -1:
+                        best = v
+                    else:
+                        bc = fol_count[best] if tier == 0 else gen_count[best]
+                        bf = fol_first[best] if tier == 0 else gen_first[best]
+                        if c > bc or (c == bc and f < bf):
+                            best = v
+                if best == -1:
+                    break
+                taken[best] = True
+                picks[r, k] = best
+                k += 1
+
+        actual = numbers[i]
+        hit = False
+        for s in range(bet_size):
+            if picks[r, s] == actual:
+                hit = True
+        profit[r] = payout - bet_size if hit else -bet_size
+    return picks, profit
+
+_JITTED = {}
+
+def _jit(fn):
+    if fn not in _JITTED:
+        from numba import njit
+        _JITTED[fn] = njit(cache=True)(fn)
+    return _JITTED[fn]
+
+# --- Public API ---
+
+def window_sets(numbers, W, use_jit=None):
+    numbers = np.ascontiguousarray(numbers, dtype=np.int64)
+    if _resolve(use_jit):
+        return _jit(_window_sets_loop)(numbers, W)
+    return _window_sets_numpy(numbers, W)
+
+def count_combinations(sets, targets, year_idx, n_years, use_jit=None):
+    targets = np.ascontiguousarray(targets, dtype=np.int64)
+    year_idx = np.ascontiguousarray(year_idx, dtype=np.int64)
+    if _resolve(use_jit):
+        return _jit(_count_combinations_loop)(sets, targets, year_idx, n_years, PATTERN_INDEX)
+    return _count_combinations_numpy(sets, targets, year_idx, n_years)
+
+def sector_backtest(numbers, start_idx, history_window, bet_size, payout, use_jit=None):
+    numbers = np.ascontiguousarray(numbers, dtype=np.int64)
+    if _resolve(use_jit):
+        return _jit(_sector_backtest_loop)(numbers, start_idx, history_window, bet_size, payout)
+    return _sector_backtest_numpy(numbers, start_idx, history_window, bet_size, payout)
+
+# --- Parity Check ---
+
+def check_parity(numbers, year_idx, windows=(3, 5, 8), start_idx=None, history_window=1000, bet_size=4, payout=30):
+    """Run every kernel through both paths and assert identical outputs."""
+    if not HAS_NUMBA:
+        raise RuntimeError("numba is not installed, nothing to compare against")
+    numbers = np.asarray(numbers, dtype=np.int64)
+    year_idx = np.asarray(year_idx, dtype=np.int64)
+    n_years = int(year_idx.max()) + 1
+    if start_idx is None:
+        start_idx = max(len(numbers) - 5000, history_window)
+
+    timings = {}
+    for W in windows:
+        outputs = {}
+        for use_jit in (True, False):
+            t0 = time.perf_counter()
+            sets = window_sets(numbers, W, use_jit=use_jit)
+            counts = count_combinations(sets, numbers[W:], year_idx[W:], n_years, use_jit=use_jit)
+            timings[(f"combinations W={W}", use_jit)] = time.perf_counter() - t0
+            outputs[use_jit] = (sets,) + tuple(counts)
+        for a, b in zip(outputs[True], outputs[False]):
+            assert np.array_equal(a, b), f"Combination counts differ for W={W}"
+
+    outputs = {}
+    for use_jit in (True, False):
+        t0 = time.perf_counter()
+        outputs[use_jit] = sector_backtest(numbers, start_idx, history_window, bet_size, payout, use_jit=use_jit)
+        timings[("sector backtest", use_jit)] = time.perf_counter() - t0
+    for a, b in zip(outputs[True], outputs[False]):
+        assert np.array_equal(a, b), "Sector backtest differs"
+
+    return timings
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    df = pd.read_csv("lotto_activo_clean.csv")
+    df['DateTime'] = pd.to_datetime(df['DateTime'])
+    df = df.sort_values('DateTime').reset_index(drop=True)
+    years = df['DateTime'].dt.year.values
+
+    # First call compiles; run twice so the timings show steady-state speed
+    check_parity(df['Number_Int'].values, years - years.min())
+    timings = check_parity(df['Number_Int'].values, years - years.min())
+
+    logging.info("--- PARITY OK (JIT == NumPy) ---")
+    for name in sorted({k[0] for k in timings}):
+        logging.info(f"{name:<22} | JIT {timings[(name, True)]:.3f}s | NumPy {timings[(name, False)]:.3f}s")
@@ -0,0 +1,158 @@
+import numpy as np
+import logging
+import sys
+import time
+import fast_kernels
+
+# Configuration
+PATTERNS_INDEX = "master_patterns_yearly.npz" # Binary twin of master_patterns.csv (see comprehensive_miner)
+INPUT_FILE = "lotto_activo_clean.csv"
+PAYOUT = 30 # 30:1
+MIN_RULE_ROI = None # None: every mined rule. A number keeps only rules with ROI above it
+MAX_TARGETS = 4 # K: at most this many animals per draw
+STAKE = 1 # Units per animal
+STAKE_BUDGET = 4 # Max units staked per draw
+MIN_EV = 1.5 # EV per unit is rule ROI / 100 (0 never filters): 1.5 bets only what radar_bot's ROI > 150 alerts cover
+
+def load_rules(path=PATTERNS_INDEX, min_roi=MIN_RULE_ROI):
+    # Rule arrays from the binary pattern index (no pandas, so the bot can start fast):
+    # window, pattern id, target, hit rate (Wins / Triggers), plus the CSV's ROI and Stability
+    index = np.load(path)
+    triggers, wins = index["triggers"], index["wins"]
+    total_triggers = triggers.sum(axis=1)
+    total_wins = wins.sum(axis=1)
+    roi = (((total_wins * PAYOUT) - total_triggers) / total_triggers) * 100
+    keep = roi > min_roi if min_roi is not None else np.ones(len(roi), dtype=bool)
+
+    pattern = index["pattern"][keep]
+    third = np.where(pattern[:, 2] < 0, fast_kernels.N_ANIMALS, pattern[:, 2])
+    active = (triggers[keep] > 0).sum(axis=1)
+    profitable = ((triggers[keep] > 0) & ((wins[keep] * PAYOUT) - triggers[keep] > 0)).sum(axis=1)
+    return {
+        "window": index["window"][keep].astype(np.int64),
+        "pattern": pattern,
+        "pid": fast_kernels.PATTERN_INDEX[pattern[:, 0], pattern[:, 1], third],
+        "target": index["target"][keep].astype(np.int64),
+        "hit_rate": total_wins[keep] / total_triggers[keep],
+        "roi": roi[keep],
+        "stability": [f"{p}/{a} ({p / a:.0%})" for p, a in zip(profitable, active)],
+    }
+
+def subset_rules(rules, mask):
+    # Same rule arrays restricted to `mask`
+    return {key: [v for v, m in zip(val, mask) if m] if isinstance(val, list) else val[mask]
+            for key, val in rules.items()}
+
+def fired_rules(numbers, rules):
+    """Every (draw, rule) pair where the rule's pattern is inside the window before the draw.
+
+    Draw i is judged on numbers[:i]; draw len(numbers) is the upcoming one.
+    Returns two arrays (draw, rule index into `rules`).
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    n = len(numbers)
+    padded = np.append(numbers, 0) # Dummy slot so window_sets yields the upcoming draw too
+    draws, rule_ids = [], []
+
+    for W in np.unique(rules["window"]):
+        if n < W:
+            continue
+        in_w = np.nonzero(rules["window"] == W)[0]
+        # Group this window's rules by pattern id (CSR layout)
+        order = in_w[np.argsort(rules["pid"][in_w], kind="stable")]
+        r_pid = rules["pid"][order]
+        starts = np.searchsorted(r_pid, np.arange(fast_kernels.N_PATTERNS))
+        counts = np.searchsorted(r_pid, np.arange(fast_kernels.N_PATTERNS), side="right") - starts
+
+        pids = fast_kernels.window_pattern_ids(fast_kernels.window_sets(padded, W, use_jit=False))
+        rows, cols = np.nonzero(pids >= 0)
+        fired = pids[rows, cols]
+        has_rules = counts[fired] > 0
+        rows, fired = rows[has_rules], fired[has_rules]
+
+        # Expand each firing pattern into its rules
+        n_rules = counts[fired]
+        offsets = np.arange(n_rules.sum()) - np.repeat(np.cumsum(n_rules) - n_rules, n_rules)
+        draws.append(np.repeat(rows + W, n_rules))
+        rule_ids.append(order[np.repeat(starts[fired], n_rules) + offsets])
+
+    if not draws:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(draws), np.concatenate(rule_ids)
+
+def score_targets(numbers, rules):
+    """Hit probability of every target for every draw, shape (len(numbers) + 1, 38).
+
+    Row i uses only numbers[:i], so the last row scores the upcoming draw.
+    Several rules firing on the same target do not add up: the target takes the
+    best hit rate among them, so overlapping rules never double-bet.
+    """
+    scores = np.zeros((len(numbers) + 1, fast_kernels.N_ANIMALS))
+    draw, rule_idx = fired_rules(numbers, rules)
+    np.maximum.at(scores, (draw, rules["target"][rule_idx]), rules["hit_rate"][rule_idx])
+    return scores
+
+def select_targets(scores, k=MAX_TARGETS, budget=STAKE_BUDGET, stake=STAKE, min_ev=MIN_EV):
+    # Top-k targets by expected value per unit, capped by the stake budget. Picks padded with -1.
+    k = min(k, budget // stake)
+    ev = scores * PAYOUT - 1
+    order = np.argsort(-ev, axis=1, kind="stable")[:, :k]
+    best_ev = np.take_along_axis(ev, order, axis=1)
+    picks = np.where((best_ev > min_ev) & (np.take_along_axis(scores, order, axis=1) > 0), order, -1)
+    return picks, np.where(picks >= 0, best_ev, 0.0)
+
+def backtest(numbers, rules, start_idx=0, k=MAX_TARGETS, budget=STAKE_BUDGET, stake=STAKE, min_ev=MIN_EV):
+    """Replay the selection policy over numbers[start_idx:], vectorized.
+
+    The rules were mined on the same history, so this is an in-sample figure:
+    use it to compare K / budget / thresholds, not as an expected return.
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    scores = score_targets(numbers, rules)[start_idx:len(numbers)]
+    picks, _ = select_targets(scores, k, budget, stake, min_ev)
+    actual = numbers[start_idx:]
+
+    n_bets = (picks >= 0).sum(axis=1)
+    hit = (picks == actual[:, None]).any(axis=1)
+    profit = hit * stake * PAYOUT - n_bets * stake
+    staked = int(n_bets.sum()) * stake
+    return {
+        "Draws": len(actual),
+        "Draws_Bet": int((n_bets > 0).sum()),
+        "Bets": int(n_bets.sum()),
+        "Hits": int(hit.sum()),
+        "Staked": staked,
+        "Balance": int(profit.sum()),
+        "ROI": profit.sum() / staked * 100 if staked else 0.0,
+        "Max_Drawdown": int((np.maximum.accumulate(np.cumsum(profit)) - np.cumsum(profit)).max()) if len(profit) else 0,
+    }
+
+def suggest(history, rules, k=MAX_TARGETS, budget=STAKE_BUDGET, stake=STAKE, min_ev=MIN_EV):
+    # Portfolio for the draw right after `history`: list of (target, expected value per unit)
+    scores = score_targets(history[-int(rules["window"].max()):], rules)[-1:] if len(rules["window"]) else np.zeros((1, fast_kernels.N_ANIMALS))
+    picks, ev = select_targets(scores, k, budget, stake, min_ev)
+    return [(int(p), float(e)) for p, e in zip(picks[0], ev[0]) if p >= 0]
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # python portfolio.py [K] [BUDGET] [MIN_EV] [MIN_ROI]
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_TARGETS
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else STAKE_BUDGET
+    min_ev = float(sys.argv[3]) if len(sys.argv) > 3 else MIN_EV
+    min_roi = float(sys.argv[4]) if len(sys.argv) > 4 else MIN_RULE_ROI
+
+    df = pd.read_csv(INPUT_FILE)
+    df['DateTime'] = pd.to_datetime(df['DateTime'])
+    df = df.sort_values('DateTime').reset_index(drop=True)
+    rules = load_rules(min_roi=min_roi)
+
+    t0 = time.perf_counter()
+    res = backtest(df['Number_Int'].values, rules, k=k, budget=budget, min_ev=min_ev)
+    elapsed = time.perf_counter() - t0
+
+    logging.info(f"--- PORTFOLIO BACKTEST (K={k}, Budget={budget}, Min EV={min_ev}, Min ROI={min_roi}, {len(rules['pid'])} rules) ---")
+    for key, val in res.items():
+        logging.info(f"{key:<13}: {val:.2f}" if isinstance(val, float) else f"{key:<13}: {val}")
+    logging.info(f"Backtest time: {elapsed:.2f}s (in-sample: rules were mined on this same history)")
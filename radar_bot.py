@@ -1,18 +1,21 @@
-import pandas as pd
-import numpy as np
-import logging
-import ast
+# Hot path for the hourly cron: stdlib + numpy only (see requirements-bot.txt).
+# No pandas / BeautifulSoup / requests / asyncio; history and patterns come from binary files.
 import os
-import requests
+import sys
 import time
+import json
 import datetime
-from bs4 import BeautifulSoup
-import asyncio
+import urllib.request
+from html.parser import HTMLParser
+import numpy as np
+import portfolio
+from animals import ANIMAL_MAP
 
 # Configuration
-PATTERNS_FILE = "master_patterns.csv"
-INPUT_FILE = "lotto_activo_clean.csv"
+PATTERNS_FILE = "master_patterns_yearly.npz" # Binary pattern index written by comprehensive_miner
+INPUT_FILE = "lotto_activo_clean.npz" # Binary history written by data_processor
 CHECK_INTERVAL_SECONDS = 300 # 5 minutes
+MIN_PATTERN_ROI = 150 # Only patterns above this ROI raise their own alert (the portfolio uses every rule)
 
 # Telegram Keys (User must set these)
 TELEGRAM_BOT_TOKEN = "8459641995:AAEmBN3igwrkkRlVFVBUI6dTF0glxY6-a-E" 
@@ -32,17 +35,6 @@ IRON_CHAINS = {
     3: 34,   # Ciempies -> Venado
 }
 
-# Animal Names Mapping
-ANIMAL_MAP = {
-    0: "Delfin", 1: "Carnero", 2: "Toro", 3: "Ciempies", 4: "Alacran", 5: "Leon", 
-    6: "Rana", 7: "Perico", 8: "Raton", 9: "Aguila", 10: "Tigre", 11: "Gato", 
-    12: "Caballo", 13: "Mono", 14: "Paloma", 15: "Zorro", 16: "Oso", 17: "Pavo", 
-    18: "Burro", 19: "Chivo", 20: "Cochino", 21: "Gallo", 22: "Camello", 23: "Cebra", 
-    24: "Iguana", 25: "Gallina", 26: "Vaca", 27: "Perro", 28: "Zamuro", 29: "Elefante", 
-    30: "Caiman", 31: "Lapa", 32: "Ardilla", 33: "Pescado", 34: "Venado", 35: "Jirafa", 
-    36: "Culebra", 37: "Ballena" # 00 mapping
-}
-
 def send_telegram(message):
     if TELEGRAM_BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
         print("[TELEGRAM SIMULATION] " + message)
@@ -55,85 +47,153 @@ def send_telegram(message):
         "parse_mode": "Markdown"
     }
     try:
-        requests.post(url, json=payload, timeout=5)
+        req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+        urllib.request.urlopen(req, timeout=5).close()
     except Exception as e:
         print(f"Failed to send Telegram: {e}")
 
-def load_patterns():
+def load_rules():
     if not os.path.exists(PATTERNS_FILE):
+        return None
+    return portfolio.load_rules(PATTERNS_FILE)
+
+def load_patterns(rules=None):
+    rules = load_rules() if rules is None else rules
+    if rules is None:
         return []
-    df = pd.read_csv(PATTERNS_FILE)
+    rules = portfolio.subset_rules(rules, rules["roi"] > MIN_PATTERN_ROI)
     patterns = []
-    df = df[df['ROI'] > 150]
-    for idx, row in df.iterrows():
-        try:
-            pat_str = row['Pattern'].replace("np.int64(", "").replace(")", "")
-            pat_list = ast.literal_eval(pat_str)
-            patterns.append({
-                "Window": int(row['Window']),
-                "Context": set(pat_list),
-                "Target": int(row['Target']),
-                "ROI": float(row['ROI']),
-                "Stability": row['Stability']
-            })
-        except:
-            continue
+    for k in range(len(rules["pid"])):
+        patterns.append({
+            "Window": int(rules["window"][k]),
+            "Context": {int(v) for v in rules["pattern"][k] if v >= 0},
+            "Target": int(rules["target"][k]),
+            "ROI": float(rules["roi"][k]),
+            "Stability": rules["stability"][k]
+        })
     return patterns
 
+class CardParser(HTMLParser):
+    # Minimal stand-in for BeautifulSoup: (h4, h5) text of every <div class="circle-legend">.
+    # Text is joined like get_text(strip=True).
+    def __init__(self):
+        super().__init__()
+        self.cards = []
+        self._depth = 0 # <div> nesting inside the current card
+        self._tag = None
+        self._text = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self._depth:
+                self._depth += 1
+            elif "circle-legend" in (dict(attrs).get("class") or "").split():
+                self._depth = 1
+                self._text = {}
+        elif self._depth and tag in ("h4", "h5") and tag not in self._text:
+            self._tag = tag
+            self._text[tag] = []
+
+    def handle_endtag(self, tag):
+        if tag == self._tag:
+            self._tag = None
+        elif tag == "div" and self._depth:
+            self._depth -= 1
+            if not self._depth:
+                h4, h5 = self._text.get("h4"), self._text.get("h5")
+                self.cards.append((
+                    "".join(s.strip() for s in h4) if h4 is not None else None,
+                    "".join(s.strip() for s in h5) if h5 is not None else None,
+                ))
+
+    def handle_data(self, data):
+        if self._tag:
+            self._text[self._tag].append(data)
+
+def parse_draws(html):
+    parser = CardParser()
+    parser.feed(html)
+    results = []
+    for h4, h5 in parser.cards:
+        if h4 and h5:
+            text_parts = h4.split(" ")
+            time_val = h5.replace("Lotto Activo", "").strip()
+            
+            if len(text_parts) >= 2:
+                raw_num = text_parts[0]
+                # Map to int
+                if raw_num == "00": num_int = 37
+                else: num_int = int(raw_num)
+                
+                results.append((time_val, num_int))
+    return results
+
 def get_latest_draws_from_web():
     today = datetime.datetime.now().strftime("%Y-%m-%d")
     url = BASE_URL.format(date=today)
     
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return []
-            
-        soup = BeautifulSoup(resp.text, "html.parser")
-        results = []
-        
-        cards = soup.find_all("div", class_="circle-legend")
-        for card in cards:
-            h4 = card.find("h4")
-            h5 = card.find("h5")
-            if h4 and h5:
-                text_parts = h4.get_text(strip=True).split(" ")
-                time_val = h5.get_text(strip=True).replace("Lotto Activo", "").strip()
-                
-                if len(text_parts) >= 2:
-                    raw_num = text_parts[0]
-                    # Map to int
-                    if raw_num == "00": num_int = 37
-                    else: num_int = int(raw_num)
-                    
-                    results.append((time_val, num_int))
-                    
-        # Sort by time? Usually they are ordered visually.
-        # But we just return the list.
-        # Actually we need them ordered by DRAW ORDER.
-        # The site orders them usually. We assume site order is chronologic?
-        # Usually site shows latest first or grid.
-        # Let's assume list order is chronological (Morning -> Night).
-        # To be safe, we just return the list and rely on the fact that we append new ones.
-        return results
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            if resp.status != 200:
+                return []
+            html = resp.read().decode("utf-8", errors="replace")
+        # We assume site order is chronological (Morning -> Night).
+        return parse_draws(html)
     except Exception as e:
         print(f"Scrape error: {e}")
         return []
 
-def get_initial_history():
-    if os.path.exists(INPUT_FILE):
-        df = pd.read_csv(INPUT_FILE)
-        return df['Number_Int'].tail(30).astype(int).tolist()
-    else:
+def get_initial_history(today=None):
+    # Stored draws only run straight into today's if the file ends yesterday; otherwise windows
+    # would mix today with stale draws (the gap-spanning windows the miner skips).
+    # Also cut at the file's last gap so the history itself is contiguous; a gap on the last row
+    # means the file ends on a bad date, whose draws can't be trusted either.
+    if not os.path.exists(INPUT_FILE):
         return []
+    data = np.load(INPUT_FILE)
+    numbers, gaps = data["numbers"], data["gaps"]
+    today = np.datetime64(datetime.date.today() if today is None else today, 'D')
+    if len(numbers) == 0 or data["dates"][-1] != today - np.timedelta64(1, 'D'):
+        return []
+    last_gap = int(gaps[-1]) if len(gaps) else 0
+    if last_gap == len(numbers) - 1:
+        return []
+    return numbers[max(len(numbers) - 30, last_gap):].astype(int).tolist()
+
+def match_alerts(context, patterns):
+    # Iron chains on the last draw + mined patterns whose context is inside their window
+    alerts = []
+    last_num = context[-1]
+    if last_num in IRON_CHAINS:
+        target = IRON_CHAINS[last_num]
+        alerts.append(f"⛓️ *CADENA DE HIERRO*: {ANIMAL_MAP[last_num]} -> Jugar {target} ({ANIMAL_MAP[target]})")
+    for p in patterns:
+        # A full window is needed, like the miner and portfolio.fired_rules use
+        if len(context) >= p["Window"] and p["Context"] <= set(context[-p["Window"]:]):
+            ctx = ", ".join(ANIMAL_MAP[n] for n in sorted(p["Context"]))
+            alerts.append(f"🎯 *PATRON* (V{p['Window']}) [{ctx}] -> Jugar {p['Target']} ({ANIMAL_MAP[p['Target']]}) | ROI {p['ROI']:.0f}% | {p['Stability']}")
+    return alerts
+
+def portfolio_alert(context, rules):
+    # One consolidated bet: at most MAX_TARGETS animals within the stake budget, no repeats
+    picks = portfolio.suggest(context, rules)
+    if not picks:
+        return None
+    lines = [f"{t} ({ANIMAL_MAP[t]}) EV {ev:+.2f}" for t, ev in picks]
+    return f"💼 *PORTAFOLIO* ({len(picks) * portfolio.STAKE}/{portfolio.STAKE_BUDGET} u): " + " | ".join(lines)
 
 # AHORA (Lo optimizado para GitHub Actions):
 def run_once():
     print("--- RADAR BOT (MODO SNIPER - ONE SHOT) ---")
     
     # 1. Cargar datos
-    patterns = load_patterns()
+    rules = load_rules()
+    patterns = load_patterns(rules) if rules is not None else []
     history = get_initial_history()
+    if not history:
+        print("Historial guardado no llega hasta ayer: se analizan solo los sorteos de hoy.")
     
     # 2. Descargar sorteos de hoy
     today_draws = get_latest_draws_from_web()
@@ -143,9 +203,11 @@ def run_once():
         last_time, last_num = today_draws[-1]
         print(f"Analizando sorteo: {last_time} -> {last_num}")
         
-        alerts = []
-        # ... (Aquí va tu misma lógica de IRON CHAINS y PATTERNS) ...
-        # ... (Copia y pega tus bloques 'if num in IRON_CHAINS' etc.) ...
+        context = history + [num for _, num in today_draws]
+        alerts = match_alerts(context, patterns)
+        summary = portfolio_alert(context, rules) if rules is not None else None
+        if summary:
+            alerts.append(summary)
         
         # 4. Enviar y salir
         if alerts:
@@ -157,7 +219,85 @@ def run_once():
     else:
         print("Aún no hay sorteos hoy o error de conexión.")
 
+def replay(start=None, end=None, rules=None):
+    """Replay the bot's matching (IRON_CHAINS + ROI > MIN_PATTERN_ROI patterns) over the stored history.
+
+    Each draw is judged on the draws before it, like run_once judges the latest one, and every
+    alert is settled as a 1-unit bet on that draw. The cron only runs while draws are live, so
+    only draws with an earlier draw the same day get alerts (first and after-hours draws don't).
+    """
+    data = np.load(INPUT_FILE)
+    numbers = data["numbers"].astype(np.int64)
+    dates = data["dates"]
+    rules = load_rules() if rules is None else rules
+    n = len(numbers)
+
+    live = np.zeros(n, dtype=bool)
+    live[1:] = dates[1:] == dates[:-1]
+    if start:
+        live &= dates >= np.datetime64(start)
+    if end:
+        live &= dates <= np.datetime64(end)
+
+    # Iron chains: fire on the previous draw
+    chain = np.full(len(ANIMAL_MAP), -1)
+    for src_num, target in IRON_CHAINS.items():
+        chain[src_num] = target
+    iron_target = np.full(n, -1)
+    iron_target[1:] = chain[numbers[:-1]]
+    iron_target[~live] = -1
+    iron_alert = iron_target >= 0
+    iron_hit = iron_alert & (iron_target == numbers)
+
+    # Patterns: every (draw, rule) pair whose context is in the window
+    alert_rules = portfolio.subset_rules(rules, rules["roi"] > MIN_PATTERN_ROI)
+    draw, rule_idx = portfolio.fired_rules(numbers, alert_rules)
+    keep = (draw < n)
+    keep[keep] = live[draw[keep]]
+    draw, rule_idx = draw[keep], rule_idx[keep]
+    pattern_hit = alert_rules["target"][rule_idx] == numbers[draw]
+
+    alerts = np.bincount(draw, minlength=n) + iron_alert
+    hits = np.bincount(draw, weights=pattern_hit, minlength=n).astype(int) + iron_hit
+    profit = hits * portfolio.PAYOUT - alerts
+
+    # Consolidated portfolio alert, for comparison
+    picks, _ = portfolio.select_targets(portfolio.score_targets(numbers, rules)[:n])
+    picks[~live] = -1
+    pf_bets = (picks >= 0).sum(axis=1)
+    pf_profit = (picks == numbers[:, None]).any(axis=1) * portfolio.STAKE * portfolio.PAYOUT - pf_bets * portfolio.STAKE
+
+    return {
+        "draws": int(live.sum()),
+        "alerts": alerts,
+        "hits": hits,
+        "profit": profit,
+        "iron_alerts": int(iron_alert.sum()),
+        "iron_hits": int(iron_hit.sum()),
+        "pattern_alerts": len(draw),
+        "pattern_hits": int(pattern_hit.sum()),
+        "portfolio_bets": int(pf_bets.sum()),
+        "portfolio_profit": pf_profit,
+    }
+
+def print_replay(res):
+    alerts, hits = res["alerts"], res["hits"]
+    total = int(alerts.sum())
+    print(f"Sorteos evaluados: {res['draws']}")
+    print(f"Alertas: {total} ({total / max(res['draws'], 1):.3f} por sorteo) | Sorteos con alerta: {int((alerts > 0).sum())} | Max por sorteo: {int(alerts.max())}")
+    for label, a, h in (("Cadenas", res["iron_alerts"], res["iron_hits"]), ("Patrones", res["pattern_alerts"], res["pattern_hits"])):
+        print(f"  {label:<9}: {a} alertas | {h} aciertos ({h / max(a, 1) * 100:.2f}%) | Balance {h * portfolio.PAYOUT - a} u")
+    print(f"Acierto total: {int(hits.sum()) / max(total, 1) * 100:.2f}% | Balance: {int(res['profit'].sum())} u | ROI: {res['profit'].sum() / max(total, 1) * 100:.2f}%")
+    print(f"Portafolio (K={portfolio.MAX_TARGETS}): {res['portfolio_bets']} u apostadas | Balance: {int(res['portfolio_profit'].sum())} u")
+
 if __name__ == "__main__":
-    run_once() # Ejecuta una vez y termina.
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        # python radar_bot.py replay [YYYY-MM-DD desde] [YYYY-MM-DD hasta]
+        t0 = time.perf_counter()
+        res = replay(*sys.argv[2:4])
+        print(f"--- RADAR BOT REPLAY ({time.perf_counter() - t0:.2f}s) ---")
+        print_replay(res)
+    else:
+        run_once() # Ejecuta una vez y termina.
 
 
@@ -5,6 +5,7 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 import os
+import sys
 import csv
 import logging
 import time
@@ -14,6 +15,7 @@ BASE_URL = "https://loteriadehoy.com/animalito/lottoactivo/resultados/{date}/"
 START_DATE = datetime(2017, 1, 1)
 END_DATE = datetime.now()
 OUTPUT_FILE = "lotto_activo_raw.csv"
+RESCRAPE_OUTPUT = "lotto_activo_rescrape.csv" # Targeted re-scrape (see data_processor.validate_data)
 LOG_FILE = "scraper.log"
 MAX_CONCURRENT_REQUESTS = 10 # Reduced from 20 to avoid blocks
 
@@ -92,18 +94,25 @@ def parse_html(html, date_str):
             continue
     return results
 
-async def main_async():
-    # Generate complete date list
-    dates = []
-    curr = START_DATE
-    while curr <= END_DATE:
-        dates.append(curr)
-        curr += timedelta(days=1)
-    
-    logging.info(f"Starting crawl for {len(dates)} days (2017 -> Now).")
+def load_date_list(path):
+    # One YYYY-MM-DD per line, as written by data_processor.save_rescrape_dates
+    with open(path) as f:
+        return [datetime.strptime(line.strip(), "%Y-%m-%d") for line in f if line.strip()]
+
+async def main_async(dates=None, output_file=OUTPUT_FILE):
+    if dates is None:
+        # Generate complete date list
+        dates = []
+        curr = START_DATE
+        while curr <= END_DATE:
+            dates.append(curr)
+            curr += timedelta(days=1)
+        logging.info(f"Starting crawl for {len(dates)} days (2017 -> Now).")
+    else:
+        logging.info(f"Starting targeted crawl for {len(dates)} days -> {output_file}.")
 
     # Initialize CSV
-    with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.DictWriter(f, fieldnames=["Date", "Time", "Animal_Number", "Animal_Name"])
         writer.writeheader()
 
@@ -133,7 +142,7 @@ async def main_async():
             if chunk_results:
                 total_records += len(chunk_results)
                 # Append to CSV immediately
-                with open(OUTPUT_FILE, 'a', newline='', encoding='utf-8') as f:
+                with open(output_file, 'a', newline='', encoding='utf-8') as f:
                     writer = csv.DictWriter(f, fieldnames=["Date", "Time", "Animal_Number", "Animal_Name"])
                     writer.writerows(chunk_results)
             
@@ -145,7 +154,11 @@ def main():
     try:
         if os.name == 'nt':
             asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-        asyncio.run(main_async())
+        if len(sys.argv) > 1:
+            # python scraper.py rescrape_dates.txt
+            asyncio.run(main_async(load_date_list(sys.argv[1]), RESCRAPE_OUTPUT))
+        else:
+            asyncio.run(main_async())
     except KeyboardInterrupt:
         logging.info("Scraper interrupted by user.")
 
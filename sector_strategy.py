@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import logging
+import fast_kernels
 
 # Configuration
 INPUT_FILE = "lotto_activo_clean.csv"
@@ -23,7 +24,7 @@ def get_sector(number):
     if number <= 18: return "Low"
     return "High"
 
-def run_sector_strategy():
+def run_sector_strategy(use_jit=None):
     df = load_data()
     total_len = len(df)
     
@@ -35,74 +36,26 @@ def run_sector_strategy():
     logging.info(f"--- SECTOR CROSSING STRATEGY (Last {total_len - start_idx} draws) ---")
     logging.info("Logic: If Last is Low -> Bet Top 4 High. If Last is High -> Bet Top 4 Low.")
     
-    balance = 0
-    wins = 0
-    losses = 0
-    
-    # Pre-calculate counts for Markov (approximate using full history up to start for speed base, then updating)
-    # Actually, let's just use the 'tail' method for correctness again.
-    # To speed up, we will just use a sliding window of last 1000 for stats.
-    
+    # Sliding window of last 1000 draws for Markov stats.
+    # The per-draw loop runs in fast_kernels (JIT when numba is installed, NumPy otherwise).
     history_window_size = 1000
+    numbers = df['Number_Int'].values.astype(np.int64)
+    
+    picks, profit = fast_kernels.sector_backtest(
+        numbers, start_idx, history_window_size, BET_SIZE, PAYOUT, use_jit=use_jit)
+    balances = np.cumsum(profit)
+    balance = int(balances[-1]) if len(balances) else 0
+    wins = int((profit > 0).sum())
+    losses = len(profit) - wins
     
     for i in range(start_idx, total_len):
-        # 1. Context
-        prev_draw_row = df.iloc[i-1]
-        last_val = prev_draw_row['Number_Int']
-        actual_val = df.iloc[i]['Number_Int']
-        
-        # 2. Identify Sectors
-        last_sector = get_sector(last_val)
-        target_sector = "High" if last_sector == "Low" else "Low"
-        
-        # 3. Select Candidates
-        # We look at historical behavior of 'last_val'
-        # What does 'last_val' usually transition to?
-        
-        current_history = df.iloc[i-history_window_size : i]
-        
-        # Filter: shifts
-        # We want P(Next | Prev = last_val)
-        # Fast pandas way:
-        followers = current_history[current_history['Number_Int'].shift(1) == last_val]['Number_Int']
-        
-        candidates = []
-        
-        if len(followers) > 0:
-            # Transitions exist
-            counts = followers.value_counts()
-            # Filter for TARGET SECTOR only
-            for num, count in counts.items():
-                if get_sector(num) == target_sector:
-                    candidates.append(num)
-                    
-        # If not enough candidates from Markov, fill with "Hot" numbers from target sector
-        if len(candidates) < BET_SIZE:
-            # General frequency in recent window
-            general_counts = current_history['Number_Int'].value_counts()
-            for num, count in general_counts.items():
-                if num not in candidates and get_sector(num) == target_sector:
-                    candidates.append(num)
-                    if len(candidates) >= BET_SIZE:
-                        break
-        
-        # Top 4
-        picks = candidates[:BET_SIZE]
-        
-        # 4. Bet
-        cost = BET_SIZE * 1 # 1 unit each
-        if actual_val in picks:
-            profit = (1 * PAYOUT) - cost
-            balance += profit
-            wins += 1
-            res = "WIN"
-        else:
-            balance -= cost
-            losses += 1
-            res = "LOSS"
-            
         if i % 500 == 0:
-            logging.info(f"Draw {i}: Last={last_val}({last_sector}) -> Target={target_sector} | Picks={picks} | Act={actual_val} | {res} | Bal={balance}")
+            r = i - start_idx
+            last_val = numbers[i-1]
+            last_sector = get_sector(last_val)
+            target_sector = "High" if last_sector == "Low" else "Low"
+            res = "WIN" if profit[r] > 0 else "LOSS"
+            logging.info(f"Draw {i}: Last={last_val}({last_sector}) -> Target={target_sector} | Picks={[int(p) for p in picks[r] if p >= 0]} | Act={numbers[i]} | {res} | Bal={balances[r]}")
 
     # Results
     roi = (balance / ((total_len - start_idx) * BET_SIZE)) * 100
@@ -114,15 +67,10 @@ def run_sector_strategy():
     
     # Check if Sector Logic itself was correct (did it actually cross?)
     # Simple check: calculate how often the sector actually crossed vs stayed
-    cross_hits = 0
-    stay_hits = 0
-    for i in range(start_idx, total_len):
-        prev = df.iloc[i-1]['Number_Int']
-        act = df.iloc[i]['Number_Int']
-        if get_sector(prev) != get_sector(act):
-            cross_hits += 1
-        else:
-            stay_hits += 1
+    prev_high = numbers[start_idx-1 : total_len-1] > 18
+    act_high = numbers[start_idx : total_len] > 18
+    cross_hits = int((prev_high != act_high).sum())
+    stay_hits = len(act_high) - cross_hits
             
     logging.info(f"\nSector Crossing Rate: {cross_hits/(cross_hits+stay_hits)*100:.2f}% (Neutral is ~50%)")
 